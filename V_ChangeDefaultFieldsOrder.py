@@ -24,61 +24,101 @@
 #   • Avoid external deps; rely on KiCad's shipped `pcbnew` and `wx` (wxPython).
 #   • All I/O is guarded; failures are user-friendly.
 
-import os, sys, json, shutil, re
+import os, sys, json, shutil, re, functools
 import pcbnew          # KiCad's Python API (shipped with Pcbnew)
 import wx              # KiCad bundles wxPython runtime
+# Both imports stay at module level on purpose: pcbnew is needed for the
+# ActionPlugin base class, and wx is already loaded by KiCad's scripting
+# host before plugins are discovered, so importing it here is only a
+# sys.modules lookup (and OrderDialog must subclass wx.Dialog).
 
 PLUGIN_NAME = "Change Default Fields Order (drawing.field_names)"
 PLUGIN_CATEGORY = "Utility"
 PLUGIN_DESCRIPTION = "Reorder Eeschema 'Default Fields' in drawing.field_names (eeschema.json)"
 EXPORT_FILENAME = "default_fields_order.json"
 
+JSON_INDENT = 2       # eeschema.json indent; None writes compact JSON (smaller, faster)
+
+# Optional fast JSON backend for eeschema.json; stdlib json is the fallback,
+# so the plugin still works with nothing but KiCad's bundled Python.
+# Payloads are built in memory and written with a single f.write().
+try:
+    import orjson
+
+    def _loads(b):
+        return orjson.loads(b)
+
+    def _dumps(d):
+        # orjson only knows a fixed 2-space indent: any non-None JSON_INDENT → pretty.
+        opt = orjson.OPT_NON_STR_KEYS | (0 if JSON_INDENT is None else orjson.OPT_INDENT_2)
+        return orjson.dumps(d, option=opt)
+except ImportError:
+    def _loads(b):
+        return json.loads(b)
+
+    def _dumps(d):
+        seps = (",", ":") if JSON_INDENT is None else None
+        return json.dumps(d, indent=JSON_INDENT, separators=seps, ensure_ascii=False).encode("utf-8")
+
 # ------------------------------ Paths ------------------------------
 
-def eeschema_json_path():
+@functools.lru_cache(maxsize=1)
+def _eeschema_json_candidates():
     """
-    Resolve the user's eeschema.json path.
-    Prefers KICAD_CONFIG_HOME, then platform defaults.
-    Returns None if nothing exists (caller may prompt).
+    Candidate eeschema.json paths, most preferred first.
+    Only depends on the environment, so it is computed once per session.
     """
+    candidates = []
     kch = os.environ.get("KICAD_CONFIG_HOME")
     if kch:
-        p = os.path.join(os.path.abspath(os.path.expanduser(kch)), "eeschema.json")
-        if os.path.isfile(p):
-            return p
+        candidates.append(os.path.join(os.path.abspath(os.path.expanduser(kch)), "eeschema.json"))
     if sys.platform.startswith("win"):
         appdata = os.getenv("APPDATA", "")
         if appdata:
-            p = os.path.join(appdata, "kicad", "9.0", "eeschema.json")
-            if os.path.isfile(p):
-                return p
+            candidates.append(os.path.join(appdata, "kicad", "9.0", "eeschema.json"))
     elif sys.platform.startswith("darwin"):
-        p = os.path.expanduser("~/Library/Preferences/kicad/9.0/eeschema.json")
-        if os.path.isfile(p):
-            return p
+        candidates.append(os.path.expanduser("~/Library/Preferences/kicad/9.0/eeschema.json"))
     else:
-        p = os.path.expanduser("~/.config/kicad/9.0/eeschema.json")
-        if os.path.isfile(p):
-            return p
-    return None
+        candidates.append(os.path.expanduser("~/.config/kicad/9.0/eeschema.json"))
+    return tuple(candidates)
+
+def eeschema_json_path():
+    """
+    Resolve the user's eeschema.json path.
+    Prefers KICAD_CONFIG_HOME, then platform defaults.
+    Returns None if nothing exists (caller may prompt).
+    """
+    return next((p for p in _eeschema_json_candidates() if os.path.isfile(p)), None)
 
 # ------------------------- S-expression helpers --------------------
 
 # Regex that captures:
 #   group 1 → field name (quoted, possibly with escaped quotes/backslashes)
+#             written as an "unrolled loop" so each character is consumed once
+#             and escape-heavy names cannot trigger catastrophic backtracking
 #   group 2 → anything up to the closing ) of this field (flags, e.g. " visible url")
 FIELD_RE = re.compile(
-    r'\(field\s+\(name\s+"((?:[^"\\]|\\.)*)"\)\s*([^\)]*)\)',
-    re.DOTALL
+    r'\(field\s+\(name\s+"([^"\\]*(?:\\.[^"\\]*)*)"\)\s*([^\)]*)\)',
+    re.DOTALL | re.ASCII      # KiCad writes ASCII whitespace; skip Unicode \s tables
 )
+_FIELD_FINDALL = FIELD_RE.findall
+
+# Single-pass (un)escaping: one regex substitution to unescape,
+# and a str.translate table (one C pass, no regex) to escape.
+_UNESC_RE = re.compile(r'\\(["\\])')
+_ESC_TABLE = str.maketrans({'\\': r'\\', '"': r'\"'})
 
 def _unescape(s: str) -> str:
     """Unescape \" and \\ as stored in JSON string literal."""
-    return s.replace(r'\"', '"').replace(r'\\', '\\')
+    if '\\' not in s:          # common case: nothing escaped, no copy
+        return s
+    return _UNESC_RE.sub(r"\1", s)
 
 def _escape(s: str) -> str:
     """Escape quotes/backslashes so the name survives JSON → S-expr roundtrip."""
-    return s.replace('\\', r'\\').replace('"', r'\"')
+    if '\\' not in s and '"' not in s:
+        return s
+    return s.translate(_ESC_TABLE)
 
 class FieldItem:
     """
@@ -86,37 +126,44 @@ class FieldItem:
       name   → the field name
       suffix → the raw tail captured after (name "..."), e.g. " visible", " url", " visible url".
                We keep it "raw" to preserve unknown tokens/spacing.
+               Read-only: the normalized " flags" tail is derived from it once.
     """
+    __slots__ = ("name", "_suffix", "_suffix_out")
+
     def __init__(self, name: str, suffix: str = ""):
         self.name = name
-        self.suffix = (suffix or "")
+        self._suffix = (suffix or "")
+        suf = self._suffix.strip()
+        self._suffix_out = f" {suf}" if suf else ""
+
+    @property
+    def suffix(self) -> str:
+        return self._suffix
 
     def with_suffix_inside(self) -> str:
         """
         Rebuild the exact (field ...) S-expression, keeping flags INSIDE.
         Ensures there is exactly one space before flags (if any).
         """
-        suf = self.suffix.strip()
-        suf = f" {suf}" if suf else ""
-        return f'(field (name "{_escape(self.name)}"){suf})'
+        return f'(field (name "{_escape(self.name)}"){self._suffix_out})'
 
 def parse_field_names_sexpr(sexpr: str):
     """
     Parse drawing.field_names into a list[FieldItem].
     Robust even if flags are absent or spacing varies.
     """
-    items = []
-    for m in FIELD_RE.finditer(sexpr or ""):
-        name = _unescape(m.group(1))
-        suffix = m.group(2) or ""
-        items.append(FieldItem(name, suffix))
-    return items
+    if not sexpr or "(field" not in sexpr:   # empty / "(templatefields)": skip the regex
+        return []
+    # findall() yields plain (name, flags) tuples from one C-level scan, so
+    # no Match object or .group() call is paid per field.
+    return [FieldItem(_unescape(name), suffix)
+            for name, suffix in _FIELD_FINDALL(sexpr)]
 
 def build_field_names_sexpr(items):
     """
     Assemble the full S-expression for field_names.
     """
-    return "(templatefields" + "".join(it.with_suffix_inside() for it in items) + ")"
+    return "(templatefields" + "".join([it.with_suffix_inside() for it in items]) + ")"
 
 # ---------------------------- Read / Write -------------------------
 
@@ -125,8 +172,8 @@ def load_drawing_field_names(cfg_path):
     Read eeschema.json and return (data, drawing_dict, items).
     If the key is missing, items will be an empty list (safe to edit/insert).
     """
-    with open(cfg_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(cfg_path, "rb") as f:
+        data = _loads(f.read())
     drawing = data.get("drawing", {})
     sexpr = drawing.get("field_names", "")
     items = parse_field_names_sexpr(sexpr)
@@ -134,16 +181,57 @@ def load_drawing_field_names(cfg_path):
 
 def save_drawing_field_names(cfg_path, data, drawing, items):
     """
-    Write back drawing.field_names, creating a .bak backup first.
+    Write back drawing.field_names via a .tmp file renamed into place,
+    keeping the previous file as .bak.
+    Returns False (and touches nothing, not even .bak) when field_names is
+    already up to date, True after writing.
     """
+    new_sexpr = build_field_names_sexpr(items)
+    # Compare normalized forms: KiCad's stored string has its own whitespace.
+    old_sexpr = build_field_names_sexpr(parse_field_names_sexpr(drawing.get("field_names", "")))
+    if "field_names" in drawing and new_sexpr == old_sexpr:
+        return False
+    # Serialize shallow copies: data/drawing are only updated once the file
+    # is in place, so a failed save can be retried with the same edits.
+    payload = _dumps(dict(data, drawing=dict(drawing, field_names=new_sexpr)))
+    target = os.path.realpath(cfg_path)   # update a symlink's target, keep the link
+    tmp, bak = target + ".tmp", target + ".bak"
     try:
-        shutil.copy2(cfg_path, cfg_path + ".bak")
+        with open(tmp, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(target):
+            shutil.copymode(target, tmp)     # keep the original permission bits
     except Exception:
-        pass
-    drawing["field_names"] = build_field_names_sexpr(items)
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    backed_up = False
+    try:
+        os.replace(target, bak)
+        backed_up = True
+    except OSError:
+        pass                  # no previous file (or no backup possible): still save
+    try:
+        os.replace(tmp, target)
+    except Exception:
+        # Config currently exists only as .bak: move it back before re-raising.
+        if backed_up:
+            try:
+                os.replace(bak, target)     # put the original config back
+            except OSError:
+                pass
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    drawing["field_names"] = new_sexpr
     data["drawing"] = drawing
-    with open(cfg_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    return True
 
 # ------------------------------- UI --------------------------------
 
@@ -162,7 +250,10 @@ class OrderDialog(wx.Dialog):
         super().__init__(parent, title="Reorder Default Fields (drawing.field_names)", size=(860, 640))
         self.cfg_path, self.data, self.drawing = cfg_path, data, drawing
         self.items = items[:]     # type: list[FieldItem]
+        self._names = [it.name for it in self.items]      # listbox rows, kept in step with items
+        self._name_set = set(self._names)                 # O(1) duplicate check
         self.saved = False        # track if we already saved & prompted
+        self.is_dirty = False     # any reorder/add/delete/import since opening
 
         pnl = wx.Panel(self)
         v = wx.BoxSizer(wx.VERTICAL)
@@ -177,7 +268,7 @@ class OrderDialog(wx.Dialog):
         )
         v.Add(info, 0, wx.ALL | wx.EXPAND, 8)
 
-        self.lb = wx.ListBox(pnl, choices=[it.name for it in self.items], style=wx.LB_SINGLE)
+        self.lb = wx.ListBox(pnl, choices=self._names, style=wx.LB_SINGLE)
         v.Add(self.lb, 1, wx.ALL | wx.EXPAND, 8)
 
         # Toolbar row
@@ -229,31 +320,48 @@ class OrderDialog(wx.Dialog):
 
     def refresh(self, sel=None):
         """Refresh listbox items and keep a sensible selection."""
-        self.lb.Set([it.name for it in self.items])
-        if sel is None:
-            if self.items:
-                self.lb.SetSelection(0)
-            else:
-                self.lb.SetSelection(wx.NOT_FOUND)
-        else:
-            if 0 <= sel < len(self.items):
-                self.lb.SetSelection(sel)
+        names = self._names
+        # Freeze so the rebuild repaints once, not once per inserted row.
+        self.lb.Freeze()
+        try:
+            self.lb.Set(names)
+            if sel is None:
+                if names:
+                    self.lb.SetSelection(0)
+                else:
+                    self.lb.SetSelection(wx.NOT_FOUND)
             else:
-                self.lb.SetSelection(wx.NOT_FOUND)
+                if 0 <= sel < len(names):
+                    self.lb.SetSelection(sel)
+                else:
+                    self.lb.SetSelection(wx.NOT_FOUND)
+        finally:
+            self.lb.Thaw()
 
     def _move_up(self):
         i = self.lb.GetSelection()
         if i == wx.NOT_FOUND or i == 0:
             return
         self.items[i-1], self.items[i] = self.items[i], self.items[i-1]
-        self.refresh(i-1)
+        names = self._names
+        names[i-1], names[i] = names[i], names[i-1]
+        # Only two rows changed: update them in place instead of a full refresh().
+        self.lb.SetString(i-1, names[i-1])
+        self.lb.SetString(i,   names[i])
+        self.lb.SetSelection(i-1)
+        self.is_dirty = True
 
     def _move_down(self):
         i = self.lb.GetSelection()
         if i == wx.NOT_FOUND or i >= len(self.items)-1:
             return
         self.items[i+1], self.items[i] = self.items[i], self.items[i+1]
-        self.refresh(i+1)
+        names = self._names
+        names[i+1], names[i] = names[i], names[i+1]
+        self.lb.SetString(i,   names[i])
+        self.lb.SetString(i+1, names[i+1])
+        self.lb.SetSelection(i+1)
+        self.is_dirty = True
 
     def on_up(self, evt):   self._move_up()
     def on_down(self, evt): self._move_down()
@@ -264,16 +372,26 @@ class OrderDialog(wx.Dialog):
         with wx.TextEntryDialog(self, "Field name (UPPERCASE recommended):", "Add Field") as d:
             if d.ShowModal() == wx.ID_OK:
                 name = d.GetValue().strip()
-                if name and all(it.name != name for it in self.items):
+                if name and name not in self._name_set:
                     self.items.append(FieldItem(name))
-                    self.refresh(len(self.items)-1)
+                    self._names.append(name)
+                    self._name_set.add(name)
+                    self.is_dirty = True
+                    self.lb.SetSelection(self.lb.Append(name))
 
     def on_del(self, evt):
         i = self.lb.GetSelection()
         if i == wx.NOT_FOUND:
             return
         del self.items[i]
-        self.refresh(min(i, len(self.items)-1))
+        name = self._names.pop(i)
+        # The loaded config may list a name twice; only forget it once it is gone.
+        if name not in self._names:
+            self._name_set.discard(name)
+        self.is_dirty = True
+        self.lb.Delete(i)
+        if self._names:
+            self.lb.SetSelection(min(i, len(self._names)-1))
 
     def on_export(self, evt):
         base_dir = os.path.dirname(self.cfg_path)
@@ -284,8 +402,9 @@ class OrderDialog(wx.Dialog):
                            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as fd:
             if fd.ShowModal() == wx.ID_OK:
                 path = fd.GetPath()
+                payload = json.dumps({"fields": self._names}, indent=2, ensure_ascii=False)
                 with open(path, "w", encoding="utf-8") as f:
-                    json.dump({"fields": [it.name for it in self.items]}, f, indent=2, ensure_ascii=False)
+                    f.write(payload)
                 wx.MessageBox(f"Exported to:\n{path}", "Export", wx.ICON_INFORMATION)
 
     def on_import(self, evt):
@@ -303,16 +422,17 @@ class OrderDialog(wx.Dialog):
                 names = data.get("fields")
                 if isinstance(names, list):
                     # Keep existing flags for present names; append unknowns at the end.
+                    # A dict doubles as the ordered set of imported names. Existing
+                    # items not named in the import are kept as-is, duplicates included.
                     suffix_map = {it.name: it.suffix for it in self.items}
-                    new_items, seen = [], set()
+                    ordered = {}
                     for n in names:
-                        if isinstance(n, str) and n not in seen:
-                            new_items.append(FieldItem(n, suffix_map.get(n, "")))
-                            seen.add(n)
-                    for it in self.items:
-                        if it.name not in seen:
-                            new_items.append(it)
-                    self.items = new_items
+                        if isinstance(n, str) and n not in ordered:
+                            ordered[n] = FieldItem(n, suffix_map.get(n, ""))
+                    self.items = list(ordered.values()) + [it for it in self.items if it.name not in ordered]
+                    self._names = [it.name for it in self.items]
+                    self._name_set = set(self._names)
+                    self.is_dirty = True
                     self.refresh(0)
                 else:
                     wx.MessageBox("Invalid JSON (missing 'fields' array).", "Import", wx.ICON_WARNING)
@@ -350,25 +470,31 @@ class OrderDialog(wx.Dialog):
     def on_apply(self, evt):
         """
         Save once, show restart prompt once, then close the dialog.
+        If the order is unchanged, say so instead of writing or offering a restart.
         """
         if not self.saved:
-            try:
-                save_drawing_field_names(self.cfg_path, self.data, self.drawing, self.items)
-            except Exception as e:
-                wx.MessageBox(f"Failed to write config:\n{e}", "Error", wx.ICON_ERROR)
-                return
+            written = False
+            if self.is_dirty:
+                try:
+                    written = save_drawing_field_names(self.cfg_path, self.data, self.drawing, self.items)
+                except Exception as e:
+                    wx.MessageBox(f"Failed to write config:\n{e}", "Error", wx.ICON_ERROR)
+                    return
 
-            dlg = wx.MessageDialog(
-                self,
-                "Configuration saved.\nKiCad must restart to apply changes.\n\n"
-                "Close KiCad now?",
-                "Restart KiCad",
-                style=wx.YES_NO | wx.ICON_QUESTION | wx.NO_DEFAULT
-            )
-            res = dlg.ShowModal()
-            dlg.Destroy()
-            if res == wx.ID_YES:
-                self._close_kicad_safely()
+            if written:
+                dlg = wx.MessageDialog(
+                    self,
+                    "Configuration saved.\nKiCad must restart to apply changes.\n\n"
+                    "Close KiCad now?",
+                    "Restart KiCad",
+                    style=wx.YES_NO | wx.ICON_QUESTION | wx.NO_DEFAULT
+                )
+                res = dlg.ShowModal()
+                dlg.Destroy()
+                if res == wx.ID_YES:
+                    self._close_kicad_safely()
+            else:
+                wx.MessageBox("No changes to save.", "Save", wx.ICON_INFORMATION)
 
             self.saved = True
 
@@ -379,7 +505,7 @@ class OrderDialog(wx.Dialog):
         Called if the bottom 'Save + Restart' was used.
         Do not show a second prompt if we've already saved via on_apply.
         """
-        if self.saved:
+        if self.saved or not self.is_dirty:
             return
         try:
             save_drawing_field_names(self.cfg_path, self.data, self.drawing, self.items)